@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+organize_data.py 热点路径基准测试
+基于合成日志对加载、排序、转换、导出计时并记录内存峰值，与基线对比发现性能回退
+"""
+
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import organize_data
+from gen_synthetic_logs import SYSTEM_MESSAGE, SyntheticLogGenerator
+from organize_data import ClaudeProjectOrganizer, StageProfiler
+
+
+def _git_commit() -> Optional[str]:
+    """当前代码的git提交号"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+class OrganizerBenchmark:
+    """ClaudeProjectOrganizer热点路径基准测试"""
+
+    def __init__(self, claude_dir: str, work_dir: str, repeat: int = 3):
+        """
+        初始化基准测试
+
+        Args:
+            claude_dir: 合成的.claude目录
+            work_dir: 导出文件的临时目录
+            repeat: 每项测试重复次数
+        """
+        self.claude_dir = claude_dir
+        self.work_dir = work_dir
+        self.repeat = repeat
+        if not organize_data.data_list_test:
+            organize_data.data_list_test.append({'conversations': [SYSTEM_MESSAGE]})
+        self.organizer = ClaudeProjectOrganizer(claude_dir, profiler=StageProfiler(progress_interval=0))
+        self.session_files = self.organizer.scan_directory()
+
+    def _load_all(self) -> List[List[Dict]]:
+        """加载全部会话"""
+        sessions = []
+        for session_file in self.session_files:
+            data = self.organizer.load_jsonl_file(Path(session_file.path))
+            if data:
+                sessions.append(data)
+        return sessions
+
+    def _sort_all(self, sessions: List[List[Dict]]) -> List[List[Dict]]:
+        """对全部会话按依赖关系排序"""
+        ordered = []
+        for data in sessions:
+            uuid_map = {item['uuid']: item for item in data if isinstance(item, dict) and 'uuid' in item}
+            ordered.append(self.organizer._sort_by_dependency(data, uuid_map))
+        return ordered
+
+    def _convert_all(self, ordered_sessions: List[List[Dict]]) -> Dict[str, List[Dict]]:
+        """将全部会话转换为ShareGPT格式"""
+        projects = {}
+        for i, nodes in enumerate(ordered_sessions):
+            if nodes:
+                projects[str(i)] = self.organizer._build_sharegpt_conversations({'id': str(i), 'path_id': ''}, nodes)
+        return projects
+
+    def _export(self, projects: Dict[str, List[Dict]]) -> None:
+        """导出到临时JSONL文件"""
+        self.organizer.projects = projects
+        self.organizer.export_to_jsonl(os.path.join(self.work_dir, 'bench_export.jsonl'))
+
+    def _measure(self, setup: Callable, func: Callable) -> Dict[str, float]:
+        """
+        对func计时，并单独运行一次以tracemalloc记录内存峰值
+
+        Args:
+            setup: 每次运行前准备输入（不计时），返回func的参数
+            func: 被测函数
+
+        Returns:
+            计时与内存统计
+        """
+        # 被测函数会打印损坏行警告和导出信息，丢弃输出以免控制台I/O计入耗时
+        timings = []
+        with redirect_stdout(io.StringIO()):
+            for _ in range(self.repeat):
+                arg = setup()
+                begin = time.perf_counter()
+                func(arg)
+                timings.append(time.perf_counter() - begin)
+
+            arg = setup()
+            tracemalloc.start()
+            func(arg)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return {
+            'min_seconds': min(timings),
+            'median_seconds': statistics.median(timings),
+            'peak_bytes': peak,
+        }
+
+    def run(self) -> Dict[str, Dict[str, float]]:
+        """
+        运行全部基准测试
+
+        Returns:
+            测试名 -> 计时与内存统计
+        """
+        # 转换会修改节点中的content列表，每次运行前都重新加载输入
+        results = {}
+        results['load_jsonl_file'] = self._measure(lambda: None, lambda _: self._load_all())
+        results['_sort_by_dependency'] = self._measure(self._load_all, self._sort_all)
+        results['_build_sharegpt_conversations'] = self._measure(
+            lambda: self._sort_all(self._load_all()), self._convert_all)
+        results['export_to_jsonl'] = self._measure(
+            lambda: self._convert_all(self._sort_all(self._load_all())), self._export)
+        return results
+
+
+def compare_with_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                          tolerance: float) -> List[str]:
+    """
+    与基线对比，返回回退项说明
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        tolerance: 允许的相对增幅，如0.2表示20%
+
+    Returns:
+        回退描述列表，为空表示无回退
+    """
+    # 计时使用多次运行的最小值，受机器噪声影响最小
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('min_seconds', 'peak_bytes'):
+            if previous.get(metric) and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {previous[metric]:.4g} -> {current[metric]:.4g} "
+                                   f"(+{current[metric] / previous[metric] - 1:.0%})")
+    return regressions
+
+
+def main():
+    """主函数"""
+    import argparse
+    parser = argparse.ArgumentParser(description='organize_data.py 热点路径基准测试')
+    parser.add_argument('--data-dir', default=None, help='已有的合成.claude目录，不指定时生成到临时目录')
+    parser.add_argument('--sessions', type=int, default=200, help='合成会话数 (默认: 200)')
+    parser.add_argument('--path-ids', type=int, default=10, help='合成路径ID数 (默认: 10)')
+    parser.add_argument('--depth', type=int, default=50, help='会话主链对话轮数 (默认: 50)')
+    parser.add_argument('--branching', type=int, default=3, help='分叉节点最大子节点数 (默认: 3)')
+    parser.add_argument('--branch-prob', type=float, default=0.1, help='主链节点产生分叉的概率 (默认: 0.1)')
+    parser.add_argument('--tool-result-bytes', type=int, default=4096, help='工具结果平均字节数 (默认: 4096)')
+    parser.add_argument('--malformed-rate', type=float, default=0.001, help='损坏JSON行比例 (默认: 0.001)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测试重复次数 (默认: 5)')
+    parser.add_argument('--results', default='bench_results.jsonl', help='结果追加写入的JSONL文件')
+    parser.add_argument('--baseline', default='bench_baseline.json', help='基线结果文件')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对回退幅度 (默认: 0.2)')
+    args = parser.parse_args()
+
+    params = {
+        'sessions': args.sessions,
+        'path_ids': args.path_ids,
+        'depth': args.depth,
+        'branching': args.branching,
+        'branch_prob': args.branch_prob,
+        'tool_result_bytes': args.tool_result_bytes,
+        'malformed_rate': args.malformed_rate,
+        'seed': args.seed,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        claude_dir = args.data_dir
+        if not claude_dir:
+            claude_dir = os.path.join(tmp_dir, '.claude')
+            stats = SyntheticLogGenerator(**params).generate(claude_dir)
+            print(f"生成合成数据: {stats['sessions']} 个会话，{stats['records']} 条记录，"
+                  f"{stats['bytes'] / 1e6:.1f} MB")
+        benchmark = OrganizerBenchmark(claude_dir, tmp_dir, repeat=args.repeat)
+        results = benchmark.run()
+
+    print(f"\n{'基准测试':<32}{'中位数(s)':>12}{'最小(s)':>12}{'内存峰值(MB)':>14}")
+    for name, result in results.items():
+        print(f"{name:<32}{result['median_seconds']:>12.4f}{result['min_seconds']:>12.4f}"
+              f"{result['peak_bytes'] / 1e6:>14.1f}")
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params if not args.data_dir else {'data_dir': args.data_dir},
+        'results': results,
+    }
+    with open(args.results, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"\n结果已追加到: {args.results}")
+
+    exit_code = 0
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        print(f"基线已更新: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != record['params']:
+            print("警告: 基线使用的数据参数不同，对比结果仅供参考")
+        regressions = compare_with_baseline(results, baseline.get('results', {}), args.tolerance)
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退 (容忍度 {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  ✗ {regression}")
+            exit_code = 1
+        else:
+            print(f"与基线 {args.baseline} 对比无回退")
+    else:
+        print(f"未找到基线 {args.baseline}，可使用 --update-baseline 创建")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成Claude Code日志生成脚本
+生成.claude/projects/<path_id>/<session>.jsonl目录结构，用于可复现的基准测试
+"""
+
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+MODELS = ['claude-sonnet-4-20250514', 'claude-opus-4-20250514', 'claude-3-5-haiku-20241022']
+TOOLS = ['Bash', 'Read', 'Edit', 'Grep', 'Glob', 'LS', 'Write', 'TodoWrite']
+WORDS = (
+    'the function returns a list of files in the project directory and parses each '
+    'record before sorting by dependency then writes output to jsonl with metadata '
+    'error handling config path module class test data query result model session '
+    'please check why this fails and fix the bug in the loader when input is empty'
+).split()
+
+# 系统提示，供不读取生产数据的调用方填充organize_data.data_list_test
+SYSTEM_MESSAGE = {
+    'from': 'system',
+    'value': 'You are Claude Code, an interactive CLI tool that helps users with software engineering tasks.'
+}
+
+
+class SyntheticLogGenerator:
+    """合成.claude日志生成器"""
+
+    def __init__(self, sessions: int = 100, path_ids: int = 10, depth: int = 20,
+                 branching: int = 2, branch_prob: float = 0.1, tool_result_bytes: int = 2048,
+                 malformed_rate: float = 0.0, seed: int = 0):
+        """
+        初始化生成器
+
+        Args:
+            sessions: 会话文件总数
+            path_ids: 路径ID目录数，会话在其间均匀分布
+            depth: 每个会话主链上的对话轮数（一问一答为一轮）
+            branching: 分叉节点的最大子节点数（含主链）
+            branch_prob: 主链节点产生分叉（重试/侧链）的概率
+            tool_result_bytes: 工具结果负载的平均字节数
+            malformed_rate: 写入损坏JSON行的概率
+            seed: 随机种子
+        """
+        self.sessions = sessions
+        self.path_ids = max(1, path_ids)
+        self.depth = depth
+        self.branching = max(1, branching)
+        self.branch_prob = branch_prob
+        self.tool_result_bytes = tool_result_bytes
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self._clock = datetime(2025, 7, 1)
+
+    def _uuid(self) -> str:
+        """基于种子生成可复现的UUID"""
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _timestamp(self) -> str:
+        """单调递增的ISO时间戳"""
+        self._clock += timedelta(milliseconds=self.rng.randint(200, 20000))
+        return self._clock.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    def _text(self, words: int) -> str:
+        """随机文本"""
+        return ' '.join(self.rng.choice(WORDS) for _ in range(max(1, words)))
+
+    def _payload(self) -> str:
+        """工具结果负载，大小在tool_result_bytes附近波动"""
+        size = max(1, int(self.rng.expovariate(1.0 / self.tool_result_bytes))) if self.tool_result_bytes else 0
+        lines = []
+        total = 0
+        while total < size:
+            line = f"{self.rng.randint(1, 9999):>6}\t{self._text(self.rng.randint(3, 15))}"
+            lines.append(line)
+            total += len(line) + 1
+        return '\n'.join(lines)[:size]
+
+    def _record(self, parent: Optional[str], session_id: str, cwd: str, message: Dict,
+                sidechain: bool = False, **extra) -> Dict:
+        """构造一条日志记录"""
+        record = {
+            'parentUuid': parent,
+            'isSidechain': sidechain,
+            'userType': 'external',
+            'cwd': cwd,
+            'sessionId': session_id,
+            'version': '1.0.51',
+            'type': message['role'],
+            'message': message,
+            'uuid': self._uuid(),
+            'timestamp': self._timestamp(),
+        }
+        record.update(extra)
+        return record
+
+    def _turn(self, parent: Optional[str], session_id: str, cwd: str, model: str,
+              sidechain: bool = False) -> List[Dict]:
+        """
+        生成一轮对话：用户消息或工具结果，加上助手回复
+
+        Returns:
+            按父子顺序排列的记录列表
+        """
+        records = []
+        if parent is None or self.rng.random() < 0.3:
+            user = self._record(parent, session_id, cwd, {
+                'role': 'user',
+                'content': self._text(self.rng.randint(5, 40)),
+            }, sidechain)
+        else:
+            tool_use_id = f"toolu_{self.rng.getrandbits(64):016x}"
+            payload = self._payload()
+            user = self._record(parent, session_id, cwd, {
+                'role': 'user',
+                'content': [{'tool_use_id': tool_use_id, 'type': 'tool_result', 'content': payload}],
+            }, sidechain, toolUseResult={'stdout': payload, 'stderr': '', 'interrupted': False})
+        records.append(user)
+
+        content = []
+        if self.rng.random() < 0.3:
+            content.append({'type': 'thinking', 'thinking': self._text(self.rng.randint(10, 60))})
+        content.append({'type': 'text', 'text': self._text(self.rng.randint(5, 80))})
+        if self.rng.random() < 0.7:
+            tool = self.rng.choice(TOOLS)
+            content.append({
+                'type': 'tool_use',
+                'id': f"toolu_{self.rng.getrandbits(64):016x}",
+                'name': tool,
+                'input': {'command' if tool == 'Bash' else 'path': f"{cwd}/{self._text(2).replace(' ', '_')}"},
+            })
+        assistant = self._record(user['uuid'], session_id, cwd, {
+            'id': f"msg_{self.rng.getrandbits(64):016x}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': model,
+            'content': content,
+            'stop_reason': None,
+            'usage': {'input_tokens': self.rng.randint(10, 5000), 'output_tokens': self.rng.randint(10, 2000)},
+        }, sidechain, requestId=f"req_{self.rng.getrandbits(64):016x}")
+        records.append(assistant)
+        return records
+
+    def generate_session(self, session_id: str, cwd: str) -> List[Dict]:
+        """
+        生成一个会话的全部记录
+
+        Args:
+            session_id: 会话ID
+            cwd: 会话工作目录
+
+        Returns:
+            会话记录列表
+        """
+        model = self.rng.choice(MODELS)
+        records = [{'type': 'summary', 'summary': self._text(6), 'leafUuid': self._uuid()}]
+        parent = None
+        for _ in range(self.depth):
+            turn = self._turn(parent, session_id, cwd, model)
+            records.extend(turn)
+            # 在主链节点上产生分叉，模拟重试和侧链
+            if parent is not None and self.rng.random() < self.branch_prob:
+                for _ in range(self.rng.randint(1, self.branching - 1) if self.branching > 1 else 0):
+                    branch_parent = parent
+                    for _ in range(self.rng.randint(1, 3)):
+                        branch = self._turn(branch_parent, session_id, cwd, model, sidechain=True)
+                        records.extend(branch)
+                        branch_parent = branch[-1]['uuid']
+            parent = turn[-1]['uuid']
+        return records
+
+    def generate(self, output_dir: str) -> Dict[str, int]:
+        """
+        生成完整的.claude目录
+
+        Args:
+            output_dir: 输出的.claude目录路径
+
+        Returns:
+            生成统计信息
+        """
+        projects_dir = Path(output_dir) / 'projects'
+        stats = {'sessions': 0, 'records': 0, 'malformed_lines': 0, 'bytes': 0}
+        path_ids = []
+        for i in range(self.path_ids):
+            cwd = f"/home/user/repos/project_{i}"
+            path_ids.append((cwd.replace('/', '-'), cwd))
+
+        for i in range(self.sessions):
+            path_id, cwd = path_ids[i % self.path_ids]
+            path_dir = projects_dir / path_id
+            path_dir.mkdir(parents=True, exist_ok=True)
+            session_id = self._uuid()
+            records = self.generate_session(session_id, cwd)
+
+            file_path = path_dir / f"{session_id}.jsonl"
+            with open(file_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    line = json.dumps(record, ensure_ascii=False)
+                    if self.malformed_rate and self.rng.random() < self.malformed_rate:
+                        # 截断的JSON行，模拟写入中断
+                        line = line[:self.rng.randint(1, max(1, len(line) - 1))]
+                        stats['malformed_lines'] += 1
+                    f.write(line + '\n')
+            stats['sessions'] += 1
+            stats['records'] += len(records)
+            stats['bytes'] += file_path.stat().st_size
+        return stats
+
+
+def main():
+    """主函数"""
+    import argparse
+    parser = argparse.ArgumentParser(description='生成合成的Claude Code log数据')
+    parser.add_argument('--output-dir', required=True, help='输出的.claude目录路径')
+    parser.add_argument('--sessions', type=int, default=100, help='会话文件总数 (默认: 100)')
+    parser.add_argument('--path-ids', type=int, default=10, help='路径ID目录数 (默认: 10)')
+    parser.add_argument('--depth', type=int, default=20, help='每个会话主链的对话轮数 (默认: 20)')
+    parser.add_argument('--branching', type=int, default=2, help='分叉节点的最大子节点数 (默认: 2)')
+    parser.add_argument('--branch-prob', type=float, default=0.1, help='主链节点产生分叉的概率 (默认: 0.1)')
+    parser.add_argument('--tool-result-bytes', type=int, default=2048, help='工具结果平均字节数 (默认: 2048)')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='损坏JSON行的比例 (默认: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    args = parser.parse_args()
+
+    generator = SyntheticLogGenerator(
+        sessions=args.sessions,
+        path_ids=args.path_ids,
+        depth=args.depth,
+        branching=args.branching,
+        branch_prob=args.branch_prob,
+        tool_result_bytes=args.tool_result_bytes,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    stats = generator.generate(args.output_dir)
+    print(f"生成 {stats['sessions']} 个会话，{stats['records']} 条记录，"
+          f"{stats['malformed_lines']} 行损坏，共 {stats['bytes'] / 1e6:.1f} MB: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
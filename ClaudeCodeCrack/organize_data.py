@@ -2,28 +2,40 @@
 # -*- coding: utf-8 -*-
 """
 Claude项目数据整理脚本
-整理.claude目录中的projects数据，并输出为jsonl格式
+整理.claude目录中的projects数据，并输出为jsonl或parquet格式
 """
 
 import json
 import os
 import re
+import base64
 import hashlib
+import time
+import zlib
+import cProfile
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 
 
 input_file = '/mnt/bn/tiktok-mm-5/aiic/users/tianyu/OpenCoder/zili/work_dir/sharegpt_training_data/claude_sonnet_4_20250514_20250714_053209.jsonl'
 # input_file = '/mnt/bn/tiktok-mm-5/aiic/users/tianyu/organized_projects.jsonl'
 data_list_test = []
-with open(input_file, 'r', encoding='utf-8') as f:
-    for line in f:
-        data = json.loads(line)
-        data_list_test.append(data)
+if os.path.exists(input_file):
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            data = json.loads(line)
+            data_list_test.append(data)
 
-print(f"读取 {len(data_list_test)} 条数据")
+    print(f"读取 {len(data_list_test)} 条数据")
+else:
+    # 基准测试等场景下由调用方填充data_list_test
+    print(f"警告: system提示来源文件 {input_file} 不存在")
 
 # just for test
 
@@ -39,33 +51,657 @@ class Project:
     metadata: Optional[Dict] = None
 
 
+@dataclass
+class SessionFile:
+    """待处理的会话文件"""
+    path_id: str
+    project_id: str
+    path: str
+    size: int
+
+
+DEDUP_POLICIES = ('first', 'longest', 'latest')
+
+
+def conversation_text(messages: List[Dict]) -> str:
+    """
+    提取ShareGPT对话中用于去重的文本（跳过system提示）
+    
+    Args:
+        messages: ShareGPT格式的消息列表
+        
+    Returns:
+        拼接后的对话文本
+    """
+    parts = []
+    for message in messages:
+        if not isinstance(message, dict) or message.get('from') == 'system':
+            continue
+        value = message.get('value')
+        if isinstance(value, str):
+            parts.append(value)
+            continue
+        for block in value or []:
+            if not isinstance(block, dict):
+                parts.append(str(block))
+            elif block.get('type') == 'text':
+                parts.append(block.get('text') or '')
+            elif block.get('type') == 'thinking':
+                parts.append(block.get('thinking') or '')
+            elif block.get('type') == 'tool_use':
+                parts.append(json.dumps(block.get('input'), ensure_ascii=False, sort_keys=True))
+            elif block.get('type') == 'tool_result':
+                content = block.get('content')
+                if not isinstance(content, str):
+                    content = json.dumps(content, ensure_ascii=False, sort_keys=True)
+                parts.append(content)
+    return '\n'.join(parts)
+
+
+EXPORT_FORMATS = ('jsonl', 'parquet')
+
+# 内容块中单独成列的字段，其余字段以JSON保存在extra列
+_BLOCK_STRING_FIELDS = ('type', 'text', 'thinking', 'id', 'name', 'tool_use_id')
+
+
+def _to_json(value: Any) -> Optional[str]:
+    """非空值序列化为JSON字符串"""
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """解析ISO格式时间戳，失败时返回None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def import_pyarrow() -> Tuple[Any, Any]:
+    """
+    导入可选依赖pyarrow
+    
+    Returns:
+        (pyarrow, pyarrow.parquet)模块
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet导出需要安装pyarrow: pip install pyarrow")
+    return pa, pq
+
+
+def parquet_schema(pa) -> Any:
+    """
+    列式导出的Arrow schema
+    
+    Args:
+        pa: pyarrow模块
+        
+    Returns:
+        pyarrow.Schema
+    """
+    block = pa.struct(
+        [(field, pa.string()) for field in _BLOCK_STRING_FIELDS] + [
+            ('input', pa.string()),
+            ('content', pa.string()),
+            ('content_json', pa.string()),
+            ('is_error', pa.bool_()),
+            ('tool_use_result', pa.string()),
+            ('extra', pa.string()),
+        ]
+    )
+    message = pa.struct([
+        ('from', pa.string()),
+        ('value_text', pa.string()),
+        ('value', pa.list_(block)),
+    ])
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.string()),
+        ('path_id', dict_string),
+        ('model', pa.list_(dict_string)),
+        ('timestamp', pa.timestamp('ms', tz='UTC')),
+        ('timestamp_raw', pa.string()),
+        ('conversation_turns', pa.int32()),
+        ('meta_data_extra', pa.string()),
+        ('conversations', pa.list_(message)),
+    ])
+
+
+def _block_to_row(block: Any) -> Dict:
+    """将一个内容块转换为列式行"""
+    if not isinstance(block, dict):
+        return {'extra': _to_json(block)}
+    # 类型与列不符的值不放入类型化列，而是原样保存到extra，避免整批写入失败
+    typed = {field: block.get(field) is None or isinstance(block.get(field), str) for field in _BLOCK_STRING_FIELDS}
+    typed['is_error'] = block.get('is_error') is None or isinstance(block.get('is_error'), bool)
+    row = {field: block.get(field) if typed[field] else None for field in _BLOCK_STRING_FIELDS}
+    content = block.get('content')
+    row['input'] = _to_json(block.get('input'))
+    row['content'] = content if isinstance(content, str) else None
+    row['content_json'] = None if isinstance(content, str) else _to_json(content)
+    row['is_error'] = block.get('is_error') if typed['is_error'] else None
+    row['tool_use_result'] = _to_json(block.get('toolUseResult'))
+    known = {'input', 'content', 'toolUseResult'} | {field for field, ok in typed.items() if ok}
+    extra = {key: value for key, value in block.items() if key not in known}
+    row['extra'] = _to_json(extra) if extra else None
+    return row
+
+
+def conversation_to_row(conversation: Dict) -> Dict:
+    """
+    将ShareGPT格式对话转换为列式导出的一行
+    
+    Args:
+        conversation: 包含conversations和meta_data的对话
+        
+    Returns:
+        与parquet_schema对应的行字典
+    """
+    meta_data = dict(conversation.get('meta_data') or {})
+    models = meta_data.pop('model', None) or []
+    timestamp = meta_data.pop('timestamp', None)
+    row = {
+        'id': meta_data.pop('id', None),
+        'path_id': meta_data.pop('path_id', None),
+        'model': list(models),
+        'timestamp': _parse_timestamp(timestamp),
+        'timestamp_raw': timestamp,
+        'conversation_turns': meta_data.pop('conversation_turns', None),
+        'meta_data_extra': _to_json(meta_data) if meta_data else None,
+        'conversations': [],
+    }
+    for message in conversation.get('conversations', []):
+        value = message.get('value')
+        row['conversations'].append({
+            'from': message.get('from'),
+            'value_text': value if isinstance(value, str) else None,
+            'value': None if isinstance(value, str) else [_block_to_row(block) for block in value or []],
+        })
+    return row
+
+
+class MinHashDeduplicator:
+    """
+    基于MinHash签名和LSH分桶的近重复会话检测器（流式）
+    
+    签名采用单置换哈希(one permutation hashing)：每个shingle只哈希一次，
+    按哈希值分到num_perm个桶中取桶内最小值，空桶从后续非空桶借值填充
+    """
+    
+    _MAX_HASH = (1 << 32) - 1
+    
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 5, policy: str = 'longest',
+                 signature_file: Optional[str] = None, seed: int = 1):
+        """
+        初始化去重器
+        
+        Args:
+            num_perm: MinHash签名长度（置换个数）
+            bands: LSH分桶的band数，必须整除num_perm
+            threshold: 判定为近重复的Jaccard相似度阈值
+            shingle_size: 词级shingle长度
+            policy: 簇内保留策略，first(最先出现)/longest(轮次最多)/latest(时间最新)
+            signature_file: 签名持久化文件，增量运行时只对新会话计算签名
+            seed: shingle哈希的种子
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) 必须能被 bands ({bands}) 整除")
+        if policy not in DEDUP_POLICIES:
+            raise ValueError(f"未知的去重策略: {policy}，可选: {', '.join(DEDUP_POLICIES)}")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.policy = policy
+        self.signature_file = Path(signature_file) if signature_file else None
+        self.seed = seed
+        
+        self._bin_width = (self._MAX_HASH + 1) // num_perm
+        
+        # band -> 桶键 -> 会话key列表，查询时按簇压缩为每簇一个条目
+        self.buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        # 并查集，根节点对应一个近重复簇
+        self.parent: Dict[str, str] = {}
+        # 簇根 -> 簇代表信息（含签名），相似度只与代表比较
+        self.representatives: Dict[str, Dict] = {}
+        # 文本摘要 -> 签名，持久化以支持增量运行
+        self.signature_cache: Dict[str, array] = {}
+        # 本次运行查询过的摘要，只持久化这些，已变化或删除的会话的旧签名随之淘汰
+        self.used_digests: set = set()
+        self.stats = {'sessions': 0, 'hashed': 0, 'cache_hits': 0, 'duplicates': 0, 'empty': 0}
+        
+        self.load_signatures()
+    
+    def _shingle_hashes(self, text: str) -> set:
+        """将文本切分为词级shingle并计算32位哈希"""
+        tokens = re.findall(r'\w+', text.lower())
+        k = self.shingle_size
+        if len(tokens) <= k:
+            shingles = [' '.join(tokens)] if tokens else []
+        else:
+            shingles = (' '.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1))
+        return {zlib.crc32(shingle.encode('utf-8'), self.seed) for shingle in shingles}
+    
+    def compute_signature(self, text: str) -> Optional[array]:
+        """
+        计算文本的MinHash签名
+        
+        Args:
+            text: 会话文本
+            
+        Returns:
+            长度为num_perm的签名，文本中没有任何词时返回None
+        """
+        hashes = self._shingle_hashes(text)
+        if not hashes:
+            return None
+        num_perm = self.num_perm
+        bins = [None] * num_perm
+        for h in hashes:
+            index, value = h % num_perm, h // num_perm
+            if bins[index] is None or value < bins[index]:
+                bins[index] = value
+        
+        # 空桶按环形顺序取下一个非空桶的值，并按距离偏移以免与该桶本身碰撞
+        signature = array('I', [self._MAX_HASH] * num_perm)
+        for index in range(num_perm):
+            for distance in range(num_perm):
+                value = bins[(index + distance) % num_perm]
+                if value is not None:
+                    signature[index] = value + distance * self._bin_width
+                    break
+        return signature
+    
+    def jaccard(self, sig_a: array, sig_b: array) -> float:
+        """根据签名估计Jaccard相似度"""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / self.num_perm
+    
+    def _find(self, key: str) -> str:
+        """并查集查找（带路径压缩）"""
+        root = key
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[key] != root:
+            self.parent[key], key = root, self.parent[key]
+        return root
+    
+    def _rank(self, info: Dict) -> Tuple:
+        """按保留策略计算优先级，值越大越优先，同分时先出现者优先"""
+        if self.policy == 'longest':
+            return (info['turns'], info['length'], -info['seq'])
+        if self.policy == 'latest':
+            return (info['timestamp'] or '', -info['seq'])
+        return (-info['seq'],)
+    
+    def add(self, key: str, text: str, turns: int = 0, timestamp: Optional[str] = None) -> Tuple[bool, List[str]]:
+        """
+        流式加入一个会话并判断是否保留
+        
+        Args:
+            key: 会话唯一标识
+            text: 会话文本
+            turns: 对话轮次
+            timestamp: 会话时间戳
+            
+        Returns:
+            (是否保留该会话, 被该会话替换掉的已保留会话key列表)
+        """
+        self.stats['sessions'] += 1
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        self.used_digests.add(digest)
+        signature = self.signature_cache.get(digest)
+        if signature is None:
+            signature = self.compute_signature(text)
+            if signature is None:
+                # 无文本的会话之间无法衡量相似度，直接保留且不参与分桶
+                self.stats['empty'] += 1
+                return True, []
+            self.signature_cache[digest] = signature
+            self.stats['hashed'] += 1
+        else:
+            self.stats['cache_hits'] += 1
+        
+        # LSH分桶查找候选簇，再与各簇代表的签名比较以过滤假阳性；
+        # 桶内条目压缩为簇根，每次加入的开销只与命中的簇数相关，与簇大小无关
+        band_keys = [tuple(signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+        candidate_roots = set()
+        for band, band_key in enumerate(band_keys):
+            bucket = self.buckets[band].get(band_key)
+            if bucket:
+                bucket_roots = {self._find(c) for c in bucket}
+                if len(bucket_roots) < len(bucket):
+                    self.buckets[band][band_key] = list(bucket_roots)
+                candidate_roots.update(bucket_roots)
+        roots = {root for root in candidate_roots
+                 if self.jaccard(signature, self.representatives[root]['signature']) >= self.threshold}
+        
+        self.parent[key] = key
+        for band, band_key in enumerate(band_keys):
+            self.buckets[band].setdefault(band_key, []).append(key)
+        
+        info = {
+            'key': key,
+            'turns': turns,
+            'length': len(text),
+            'timestamp': timestamp,
+            'seq': self.stats['sessions'],
+            'signature': signature,
+        }
+        if not roots:
+            self.representatives[key] = info
+            return True, []
+        
+        # 合并所有命中的簇（新会话成为簇根），按策略从各簇代表和新会话中选出唯一代表
+        members = [self.representatives.pop(root) for root in roots] + [info]
+        for root in roots:
+            self.parent[root] = key
+        best = max(members, key=self._rank)
+        self.representatives[key] = best
+        self.stats['duplicates'] += len(members) - 1
+        dropped = [member['key'] for member in members if member is not best and member is not info]
+        return best is info, dropped
+    
+    def load_signatures(self) -> None:
+        """从持久化文件加载已计算的签名，参数不一致时忽略"""
+        if not self.signature_file or not self.signature_file.exists():
+            return
+        try:
+            with open(self.signature_file, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header != self._signature_params():
+                    print(f"警告: 签名文件 {self.signature_file} 参数不匹配，将重新计算签名")
+                    return
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    signature = array('I')
+                    signature.frombytes(base64.b64decode(record['signature']))
+                    self.signature_cache[record['digest']] = signature
+        except (json.JSONDecodeError, KeyError, ValueError, IOError) as e:
+            print(f"无法加载签名文件 {self.signature_file}: {e}")
+            self.signature_cache.clear()
+            return
+        print(f"加载 {len(self.signature_cache)} 个已缓存签名: {self.signature_file}")
+    
+    def save_signatures(self) -> None:
+        """将本次运行用到的签名写入持久化文件（先写临时文件再替换）"""
+        if not self.signature_file:
+            return
+        self.signature_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.signature_file.with_name(self.signature_file.name + '.tmp')
+        saved = 0
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._signature_params()) + '\n')
+            for digest, signature in self.signature_cache.items():
+                if digest not in self.used_digests:
+                    continue
+                record = {'digest': digest, 'signature': base64.b64encode(signature.tobytes()).decode('ascii')}
+                f.write(json.dumps(record) + '\n')
+                saved += 1
+        os.replace(tmp_file, self.signature_file)
+        print(f"保存 {saved} 个签名到: {self.signature_file}")
+    
+    def _signature_params(self) -> Dict:
+        """影响签名结果的参数，用于校验持久化文件"""
+        return {
+            'scheme': 'oph',
+            'num_perm': self.num_perm,
+            'seed': self.seed,
+            'shingle_size': self.shingle_size,
+            'itemsize': array('I').itemsize,
+        }
+
+
+class StageProfiler:
+    """分阶段计时与计数，并以限速方式输出进度行"""
+    
+    STAGES = ('discovery', 'load', 'sort', 'convert', 'dedup', 'serialize', 'write')
+    
+    def __init__(self, enabled: bool = False, report_file: Optional[str] = None,
+                 cprofile_file: Optional[str] = None, trace_memory: bool = False,
+                 progress_interval: float = 2.0):
+        """
+        初始化分析器
+        
+        Args:
+            enabled: 是否启用profile模式（输出报告）
+            report_file: 机器可读的JSON报告路径
+            cprofile_file: cProfile统计结果输出路径
+            trace_memory: 是否使用tracemalloc追踪内存峰值
+            progress_interval: 进度行最小输出间隔（秒），<=0时关闭进度行
+        """
+        self.enabled = enabled
+        self.report_file = report_file
+        self.cprofile_file = cprofile_file
+        self.trace_memory = trace_memory
+        self.progress_interval = progress_interval
+        self.stage_seconds: Dict[str, float] = {stage: 0.0 for stage in self.STAGES}
+        self.stage_calls: Dict[str, int] = {stage: 0 for stage in self.STAGES}
+        self.counters: Dict[str, int] = {'files': 0, 'records': 0, 'bytes': 0, 'conversations': 0}
+        self._profile = None
+        self._started = None
+        self._stopped = None
+        self._last_progress = 0.0
+        self._memory = None
+    
+    def start(self) -> None:
+        """开始计时，按需启动cProfile和tracemalloc"""
+        self._started = time.perf_counter()
+        self._last_progress = self._started
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.cprofile_file:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+    
+    def stop(self) -> None:
+        """停止计时、cProfile和tracemalloc并记录结果"""
+        self._stopped = time.perf_counter()
+        if self._profile:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile_file)
+            print(f"cProfile结果已保存: {self.cprofile_file}")
+            self._profile = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self._memory = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_allocations': [
+                    {'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:20]
+                ],
+            }
+    
+    @contextmanager
+    def stage(self, name: str):
+        """统计一个阶段的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - begin)
+    
+    def add_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        """累加阶段耗时"""
+        self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+        self.stage_calls[name] = self.stage_calls.get(name, 0) + calls
+    
+    def count(self, **counters: int) -> None:
+        """累加计数器，如files/records/bytes/conversations"""
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def elapsed(self) -> float:
+        """自start()以来的耗时（秒），stop()后固定不变"""
+        if not self._started:
+            return 0.0
+        return (self._stopped or time.perf_counter()) - self._started
+    
+    def progress(self, force: bool = False) -> None:
+        """
+        输出一行吞吐量进度，按progress_interval限速
+        
+        Args:
+            force: 忽略限速立即输出（progress_interval<=0时仍不输出）
+        """
+        if self.progress_interval <= 0:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        elapsed = max(self.elapsed(), 1e-9)
+        files, records, size = self.counters['files'], self.counters['records'], self.counters['bytes']
+        print(f"进度: {files} 文件 ({files / elapsed:.1f}/s) | "
+              f"{records} 记录 ({records / elapsed:.1f}/s) | "
+              f"{size / 1e6:.1f} MB ({size / 1e6 / elapsed:.2f} MB/s) | "
+              f"{self.counters['conversations']} 对话 | 已用 {elapsed:.1f}s", flush=True)
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        生成机器可读的分析报告
+        
+        Returns:
+            包含各阶段耗时、计数器和吞吐量的字典
+        """
+        elapsed = self.elapsed()
+        throughput = {}
+        if elapsed > 0:
+            throughput = {
+                'files_per_s': self.counters['files'] / elapsed,
+                'records_per_s': self.counters['records'] / elapsed,
+                'mb_per_s': self.counters['bytes'] / 1e6 / elapsed,
+            }
+        report = {
+            'wall_seconds': elapsed,
+            'stages': {
+                name: {'seconds': self.stage_seconds[name], 'calls': self.stage_calls[name]}
+                for name in self.stage_seconds
+            },
+            'counters': dict(self.counters),
+            'throughput': throughput,
+        }
+        if self._memory:
+            report['memory'] = self._memory
+        return report
+    
+    def write_report(self) -> None:
+        """打印阶段耗时并写出JSON报告"""
+        report = self.report()
+        wall = report['wall_seconds'] or 1e-9
+        print("\n阶段耗时:")
+        for name, stage in report['stages'].items():
+            print(f"  {name:<10} {stage['seconds']:>9.3f}s {stage['seconds'] / wall:>6.1%}  ({stage['calls']} 次)")
+        if self._memory:
+            print(f"  内存峰值: {self._memory['peak_bytes'] / 1e6:.1f} MB")
+        if self.report_file:
+            with open(self.report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"分析报告已保存: {self.report_file}")
+
+
 class ClaudeProjectOrganizer:
     """Claude项目数据整理器"""
     
-    def __init__(self, claude_dir: str = ".claude"):
+    def __init__(self, claude_dir: str = ".claude", deduplicator: Optional[MinHashDeduplicator] = None,
+                 profiler: Optional[StageProfiler] = None, discovery_workers: int = 8):
         """
         初始化项目数据整理器
         
         Args:
             claude_dir: .claude目录路径
+            deduplicator: 可选的近重复会话去重器
+            profiler: 可选的阶段分析器，默认只输出进度行
+            discovery_workers: 并发扫描路径ID目录的线程数
         """
         self.claude_dir = Path(claude_dir)
         self.projects: Dict[str, Project] = {}
         self.output_file = "organized_projects.jsonl"
+        self.deduplicator = deduplicator
+        self.profiler = profiler or StageProfiler()
+        self.discovery_workers = discovery_workers
+        self.session_files: List[SessionFile] = []
     
-    def scan_directory(self) -> None:
-        """扫描.claude目录结构"""
+    def scan_directory(self) -> List[SessionFile]:
+        """
+        扫描.claude/projects目录，收集所有会话文件及其大小
+        
+        Returns:
+            按文件大小从大到小排序的会话文件列表
+        """
+        self.session_files = []
         if not self.claude_dir.exists():
             print(f"警告: {self.claude_dir} 目录不存在")
-            return
+            return self.session_files
         
         print(f"扫描目录: {self.claude_dir}")
         
-        # 查找项目相关文件
-        project_files = list(self.claude_dir.glob("**/project*.json"))
-        project_files.extend(list(self.claude_dir.glob("**/projects.json")))
+        projects_dir = self.claude_dir / "projects"
+        try:
+            with os.scandir(projects_dir) as entries:
+                path_dirs = [entry for entry in entries if entry.is_dir()]
+        except (FileNotFoundError, NotADirectoryError):
+            return self.session_files
+        
+        # 各路径ID目录之间相互独立，并发扫描以掩盖网络文件系统的元数据延迟
+        with ThreadPoolExecutor(max_workers=max(1, self.discovery_workers)) as executor:
+            for session_files in executor.map(self._scan_path_dir, path_dirs):
+                self.session_files.extend(session_files)
         
-        print(f"找到 {len(project_files)} 个项目文件")
+        # 大文件优先，避免并行/流式处理时出现长尾
+        self.session_files.sort(key=lambda session_file: session_file.size, reverse=True)
+        total_size = sum(session_file.size for session_file in self.session_files)
+        print(f"找到 {len(path_dirs)} 个路径ID，{len(self.session_files)} 个会话文件 ({total_size / 1e6:.1f} MB)")
+        return self.session_files
+    
+    def _scan_path_dir(self, path_dir: os.DirEntry) -> List[SessionFile]:
+        """
+        扫描单个路径ID目录下的JSONL会话文件
+        
+        Args:
+            path_dir: 路径ID目录
+            
+        Returns:
+            该目录下的会话文件列表
+        """
+        session_files = []
+        try:
+            entries = os.scandir(path_dir.path)
+        except OSError as e:
+            print(f"无法扫描目录 {path_dir.path}: {e}")
+            return session_files
+        
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith('.jsonl'):
+                    continue
+                # 单个文件在readdir和stat之间被删除或出现NFS错误时，只跳过该文件
+                try:
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size
+                except OSError as e:
+                    print(f"无法读取文件信息 {entry.path}: {e}")
+                    continue
+                session_files.append(SessionFile(
+                    path_id=path_dir.name,
+                    project_id=entry.name[:-len('.jsonl')],
+                    path=entry.path,
+                    size=size,
+                ))
+        return session_files
     
     def load_json_file(self, file_path: Path) -> Optional[Dict]:
         """
@@ -121,17 +757,17 @@ class ClaudeProjectOrganizer:
             path_id: 路径ID
             project_id: 项目ID
         """
-        print(f"处理项目 {project_id} 中的 {len(project_data)} 条记录")
-        
-        # 构建UUID到记录的映射
-        uuid_map = {}
-        for item in project_data:
-            if isinstance(item, dict) and 'uuid' in item:
-                uuid_map[item['uuid']] = item
+        self.profiler.count(records=len(project_data))
         
-        # 按依赖关系排序节点
-        ordered_nodes = self._sort_by_dependency(project_data, uuid_map)
-        print(f"  - 排序后节点: {len(ordered_nodes)} 个")
+        with self.profiler.stage('sort'):
+            # 构建UUID到记录的映射
+            uuid_map = {}
+            for item in project_data:
+                if isinstance(item, dict) and 'uuid' in item:
+                    uuid_map[item['uuid']] = item
+            
+            # 按依赖关系排序节点
+            ordered_nodes = self._sort_by_dependency(project_data, uuid_map)
         if not ordered_nodes: 
             return None
         # 构建对话链并转换为ShareGPT格式
@@ -140,11 +776,40 @@ class ClaudeProjectOrganizer:
             'path_id': path_id
         }
 
-        conversations = self._build_sharegpt_conversations(meta_data, ordered_nodes)
-        print(f"  - 生成对话: {len(conversations)} 个")
+        with self.profiler.stage('convert'):
+            conversations = self._build_sharegpt_conversations(meta_data, ordered_nodes)
+        
+        if self.deduplicator:
+            with self.profiler.stage('dedup'):
+                keep = self._deduplicate(project_id, conversations)
+            if not keep:
+                return None
         
         # 保存转换结果
         self.projects[project_id] = conversations
+        self.profiler.count(conversations=len(conversations))
+    
+    def _deduplicate(self, project_id: str, conversations: List[Dict]) -> bool:
+        """
+        将会话加入去重器，移除被替换的近重复会话
+        
+        Args:
+            project_id: 项目ID
+            conversations: 该项目转换后的对话列表
+            
+        Returns:
+            是否保留该会话
+        """
+        text = '\n'.join(conversation_text(conv['conversations']) for conv in conversations)
+        meta_data = conversations[-1]['meta_data']
+        keep, dropped = self.deduplicator.add(
+            project_id, text, meta_data.get('conversation_turns', 0), meta_data.get('timestamp')
+        )
+        for dropped_id in dropped:
+            dropped_conversations = self.projects.pop(dropped_id, None)
+            if dropped_conversations:
+                self.profiler.count(conversations=-len(dropped_conversations))
+        return keep
     
     def _sort_by_dependency(self, project_data: List[Dict], uuid_map: Dict[str, Dict]) -> List[Dict]:
         """按照parentUuid和uuid依赖关系排序节点"""
@@ -244,28 +909,20 @@ class ClaudeProjectOrganizer:
         """加载所有项目数据"""
         print("加载Claude项目数据...")
         
-        # 扫描目录
-        self.scan_directory()
+        with self.profiler.stage('discovery'):
+            # 扫描目录，得到按大小排序的会话文件列表
+            session_files = self.scan_directory()
         
         # 加载JSONL项目数据
-        projects_dir = self.claude_dir / "projects"
-        if projects_dir.exists():
-            for path_dir in projects_dir.iterdir():
-                if path_dir.is_dir():
-                    # 提取路径ID（目录名）
-                    path_id = path_dir.name
-                    print(f"处理路径ID: {path_id}")
-                    
-                    # 查找该目录下的所有JSONL文件
-                    for file_path in path_dir.glob("*.jsonl"):
-                        # 提取项目ID（文件名去掉.jsonl后缀）
-                        project_id = file_path.stem
-                        print(f"加载项目文件: {file_path} (路径ID: {path_id}, 项目ID: {project_id})")
-                        
-                        data_list = self.load_jsonl_file(file_path)
-                        if data_list:
-                            # 每个JSONL文件代表一个项目，传递完整的数据列表进行关系处理
-                            self.parse_projects(data_list, path_id, project_id)
+        for session_file in session_files:
+            with self.profiler.stage('load'):
+                data_list = self.load_jsonl_file(Path(session_file.path))
+            self.profiler.count(files=1, bytes=session_file.size)
+            if data_list:
+                # 每个JSONL文件代表一个项目，传递完整的数据列表进行关系处理
+                self.parse_projects(data_list, session_file.path_id, session_file.project_id)
+            self.profiler.progress()
+        self.profiler.progress(force=True)
     
     def export_to_jsonl(self, output_file: str = None) -> None:
         """
@@ -279,16 +936,77 @@ class ClaudeProjectOrganizer:
         
         print(f"导出ShareGPT格式数据到: {self.output_file}")
         
+        serialize_seconds = 0.0
+        write_seconds = 0.0
         with open(self.output_file, 'w', encoding='utf-8') as f:
             total_conversations = 0
             # 导出所有对话数据
             for project_id, conversations in self.projects.items():
                 if isinstance(conversations, list):
-                    for conversation in conversations:
-                        f.write(json.dumps(conversation, ensure_ascii=False) + '\n')
-                        total_conversations += 1
+                    begin = time.perf_counter()
+                    lines = [json.dumps(conversation, ensure_ascii=False) + '\n' for conversation in conversations]
+                    middle = time.perf_counter()
+                    f.writelines(lines)
+                    write_seconds += time.perf_counter() - middle
+                    serialize_seconds += middle - begin
+                    total_conversations += len(lines)
             
             print(f"共导出 {total_conversations} 个对话")
+        self.profiler.add_time('serialize', serialize_seconds, len(self.projects))
+        self.profiler.add_time('write', write_seconds, len(self.projects))
+    
+    def export_to_parquet(self, output_file: str = None, row_group_size: int = 1000) -> None:
+        """
+        导出ShareGPT格式数据为Parquet列式格式，按行组流式写入
+        
+        meta_data字段为独立的类型化列，path_id和模型名使用字典编码，
+        消息为嵌套列表，读取时可只投影需要的列
+        
+        Args:
+            output_file: 输出文件名
+            row_group_size: 每个行组包含的对话数
+        """
+        pa, pq = import_pyarrow()
+        
+        if output_file:
+            self.output_file = output_file
+        
+        print(f"导出ShareGPT格式数据到: {self.output_file}")
+        
+        schema = parquet_schema(pa)
+        serialize_seconds = 0.0
+        write_seconds = 0.0
+        row_groups = 0
+        total_conversations = 0
+        
+        with pq.ParquetWriter(self.output_file, schema, compression='zstd', use_dictionary=True) as writer:
+            def flush(rows: List[Dict]) -> None:
+                nonlocal serialize_seconds, write_seconds, row_groups
+                begin = time.perf_counter()
+                table = pa.Table.from_pylist(rows, schema=schema)
+                middle = time.perf_counter()
+                writer.write_table(table, row_group_size=len(rows))
+                write_seconds += time.perf_counter() - middle
+                serialize_seconds += middle - begin
+                row_groups += 1
+            
+            rows = []
+            for project_id, conversations in self.projects.items():
+                if isinstance(conversations, list):
+                    for conversation in conversations:
+                        begin = time.perf_counter()
+                        rows.append(conversation_to_row(conversation))
+                        serialize_seconds += time.perf_counter() - begin
+                        total_conversations += 1
+                        if len(rows) >= row_group_size:
+                            flush(rows)
+                            rows = []
+            if rows:
+                flush(rows)
+        
+        print(f"共导出 {total_conversations} 个对话 ({row_groups} 个行组)")
+        self.profiler.add_time('serialize', serialize_seconds, len(self.projects))
+        self.profiler.add_time('write', write_seconds, row_groups)
     
     def print_summary(self) -> None:
         """打印整理结果摘要"""
@@ -297,6 +1015,12 @@ class ClaudeProjectOrganizer:
         print("="*60)
         print(f"处理项目数: {len(self.projects)}")
         
+        if self.deduplicator:
+            stats = self.deduplicator.stats
+            print(f"去重: 共 {stats['sessions']} 个会话，移除近重复 {stats['duplicates']} 个 "
+                  f"(新计算签名 {stats['hashed']} 个，命中缓存 {stats['cache_hits']} 个，"
+                  f"无文本未参与去重 {stats['empty']} 个)")
+        
         # 统计对话信息
         if self.projects:
             total_conversations = 0
@@ -327,27 +1051,46 @@ class ClaudeProjectOrganizer:
         print(f"\n输出文件: {self.output_file}")
         print("="*60)
     
-    def organize(self, output_file: str = None) -> None:
+    def organize(self, output_file: str = None, output_format: str = 'jsonl', row_group_size: int = 1000) -> None:
         """
         执行完整的项目数据整理流程
         
         Args:
             output_file: 输出文件名
+            output_format: 输出格式，jsonl或parquet
+            row_group_size: parquet格式每个行组包含的对话数
         """
-        print("开始整理Claude项目数据...")
-        
-        # 加载所有数据
-        self.load_all_data()
+        if output_format == 'parquet':
+            # 在扫描和转换之前检查依赖，避免处理完整个目录后才失败
+            import_pyarrow()
         
-        # 处理项目数据
-        self.process_projects()
+        print("开始整理Claude项目数据...")
+        self.profiler.start()
         
-        # 导出数据
-        self.export_to_jsonl(output_file)
+        try:
+            # 加载所有数据
+            self.load_all_data()
+            
+            if self.deduplicator:
+                self.deduplicator.save_signatures()
+            
+            # 处理项目数据
+            self.process_projects()
+            
+            # 导出数据
+            if output_format == 'parquet':
+                self.export_to_parquet(output_file, row_group_size)
+            else:
+                self.export_to_jsonl(output_file)
+        finally:
+            self.profiler.stop()
         
         # 打印摘要
         self.print_summary()
         
+        if self.profiler.enabled:
+            self.profiler.write_report()
+        
         print("项目数据整理完成！")
 
 
@@ -366,13 +1109,118 @@ def main():
         default='/mnt/bn/tiktok-mm-5/aiic/users/tianyu/OpenCoder/data/organized_projects.jsonl',
         help='输出文件名 (默认: organized_projects.jsonl)'
     )
+    parser.add_argument(
+        '--format',
+        choices=EXPORT_FORMATS,
+        default='jsonl',
+        help='输出格式: jsonl 或列式 parquet (默认: jsonl)'
+    )
+    parser.add_argument(
+        '--row-group-size',
+        type=int,
+        default=1000,
+        help='parquet格式每个行组包含的对话数 (默认: 1000)'
+    )
+    
+    parser.add_argument(
+        '--dedup',
+        action='store_true',
+        help='启用基于MinHash/LSH的近重复会话去重'
+    )
+    parser.add_argument(
+        '--dedup-threshold',
+        type=float,
+        default=0.8,
+        help='近重复判定的Jaccard相似度阈值 (默认: 0.8)'
+    )
+    parser.add_argument(
+        '--dedup-policy',
+        choices=DEDUP_POLICIES,
+        default='longest',
+        help='每个近重复簇保留的代表: first/longest/latest (默认: longest)'
+    )
+    parser.add_argument(
+        '--dedup-num-perm',
+        type=int,
+        default=128,
+        help='MinHash签名长度 (默认: 128)'
+    )
+    parser.add_argument(
+        '--dedup-bands',
+        type=int,
+        default=16,
+        help='LSH分桶band数，需整除签名长度 (默认: 16)'
+    )
+    parser.add_argument(
+        '--dedup-signatures',
+        default=None,
+        help='MinHash签名持久化文件，增量运行时只对新会话计算签名'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='启用分阶段计时并输出机器可读的分析报告'
+    )
+    parser.add_argument(
+        '--profile-report',
+        default=None,
+        help='分析报告JSON路径 (默认: <输出文件>.profile.json)'
+    )
+    parser.add_argument(
+        '--cprofile',
+        default=None,
+        help='cProfile统计结果输出路径 (需配合 --profile)'
+    )
+    parser.add_argument(
+        '--tracemalloc',
+        action='store_true',
+        help='使用tracemalloc记录内存峰值和主要分配位置 (需配合 --profile)'
+    )
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=2.0,
+        help='进度行最小输出间隔秒数，0表示关闭 (默认: 2.0)'
+    )
+    
+    parser.add_argument(
+        '--discovery-workers',
+        type=int,
+        default=8,
+        help='并发扫描路径ID目录的线程数 (默认: 8)'
+    )
     
     args = parser.parse_args()
 
-    organizer = ClaudeProjectOrganizer(args.claude_dir)
+    if (args.cprofile or args.tracemalloc) and not args.profile:
+        parser.error('--cprofile 和 --tracemalloc 需要配合 --profile 使用')
+
+    if args.format == 'parquet' and args.output.endswith('.jsonl'):
+        args.output = args.output[:-len('.jsonl')] + '.parquet'
+
+    profiler = StageProfiler(
+        enabled=args.profile,
+        report_file=(args.profile_report or f"{args.output}.profile.json") if args.profile else None,
+        cprofile_file=args.cprofile if args.profile else None,
+        trace_memory=args.profile and args.tracemalloc,
+        progress_interval=args.progress_interval,
+    )
+
+    deduplicator = None
+    if args.dedup:
+        deduplicator = MinHashDeduplicator(
+            num_perm=args.dedup_num_perm,
+            bands=args.dedup_bands,
+            threshold=args.dedup_threshold,
+            policy=args.dedup_policy,
+            signature_file=args.dedup_signatures,
+        )
+
+    organizer = ClaudeProjectOrganizer(args.claude_dir, deduplicator, profiler, args.discovery_workers)
     
     try:
-        organizer.organize(args.output)
+        organizer.organize(args.output, args.format, args.row_group_size)
     except KeyboardInterrupt:
         print("\n用户中断操作")
     except Exception as e:
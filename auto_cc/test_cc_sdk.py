@@ -3,6 +3,8 @@ from claude_code_sdk import ClaudeSDKClient, ClaudeCodeOptions
 from typing import List, Dict, Optional
 import os
 import json
+import time
+import hashlib
 import argparse
 import subprocess
 import sys
@@ -79,7 +81,121 @@ def check_authentication():
         print("❌ 无法检查认证状态")
         sys.exit(1)
 
-async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl: Optional[str] = None) -> Dict[str, List[Dict]]:
+def working_dir_fingerprint(working_dir: str) -> Optional[str]:
+    """
+    Fingerprint the state of a git working tree: HEAD plus a hash of all
+    uncommitted changes (tracked diffs and untracked file contents).
+    
+    Args:
+        working_dir: Directory inside a git repository
+    
+    Returns:
+        Hex digest, or None if the directory is not a git repository
+    """
+    def git(*args) -> bytes:
+        return subprocess.run(['git', '-C', working_dir, *args],
+                              capture_output=True, check=True).stdout
+    
+    try:
+        head = git('rev-parse', 'HEAD').strip()
+        digest = hashlib.sha256(head)
+        digest.update(git('diff', 'HEAD', '--binary'))
+        untracked = git('ls-files', '--others', '--exclude-standard', '-z')
+        if untracked:
+            digest.update(untracked)
+            paths = b'\n'.join(path for path in untracked.split(b'\0') if path)
+            digest.update(subprocess.run(['git', '-C', working_dir, 'hash-object', '--stdin-paths'],
+                                         input=paths, capture_output=True, check=True).stdout)
+        return digest.hexdigest()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+class QueryResultCache:
+    """
+    Local JSON cache of successful query results, keyed by query text,
+    client options and working directory fingerprint.
+    """
+    
+    def __init__(self, cache_file: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 1000):
+        """
+        Args:
+            cache_file: Path to the JSON cache file
+            ttl_seconds: Entries older than this are treated as misses and evicted
+            max_entries: Least recently used entries are evicted beyond this size
+        """
+        # Queries chdir into their working_dir, so resolve relative paths up front
+        self.cache_file = os.path.abspath(cache_file)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict] = {}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "uncacheable": 0,
+            "saved_cost_usd": 0.0,
+            "saved_duration_ms": 0
+        }
+        self.load()
+    
+    def load(self):
+        """Load cache entries from disk, dropping expired ones."""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: Could not read cache file {self.cache_file}: {e}")
+            self.entries = {}
+        now = time.time()
+        self.entries = {key: entry for key, entry in self.entries.items()
+                        if now - entry.get("created_at", 0) <= self.ttl_seconds}
+    
+    def save(self):
+        """Write cache entries to disk atomically."""
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+    
+    @staticmethod
+    def make_key(query: str, options, fingerprint: str) -> str:
+        """Build a cache key from the query, client options and repo fingerprint."""
+        payload = json.dumps({
+            "query": query,
+            "options": repr(options),
+            "fingerprint": fingerprint
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached result record for key, or None on miss."""
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["created_at"] > self.ttl_seconds:
+            del self.entries[key]
+            entry = None
+        if not entry:
+            self.stats["misses"] += 1
+            return None
+        entry["last_used"] = time.time()
+        self.stats["hits"] += 1
+        self.stats["saved_cost_usd"] += entry["record"].get("cost_usd") or 0.0
+        self.stats["saved_duration_ms"] += entry["record"].get("duration_ms") or 0
+        return entry["record"]
+    
+    def put(self, key: str, record: Dict):
+        """Store a result record and evict least recently used entries beyond max_entries (call save() to persist)."""
+        now = time.time()
+        self.entries[key] = {"created_at": now, "last_used": now, "record": record}
+        if len(self.entries) > self.max_entries:
+            by_last_used = sorted(self.entries, key=lambda k: self.entries[k]["last_used"])
+            for stale_key in by_last_used[:len(self.entries) - self.max_entries]:
+                del self.entries[stale_key]
+
+async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl: Optional[str] = None,
+                                   cache: Optional[QueryResultCache] = None) -> Dict[str, List[Dict]]:
     """
     Process multiple queries with individual working directories.
     
@@ -88,6 +204,10 @@ async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl:
                 Example: [{"query": "How does auth work?", "working_dir": "/path/to/project1"},
                          {"query": "Explain the API", "working_dir": "/path/to/project2"}]
         output_jsonl: Optional path to JSONL file to save results incrementally
+        cache: Optional result cache; hits skip the model call and are not added to totals.
+               Cache-hit records carry cache_hit=True and the current working_dir, while
+               session_id, num_turns, cost_usd and duration_ms are those of the original run
+               (also exposed as cached_from_session_id)
     
     Returns:
         Dictionary containing results for all queries with metadata
@@ -98,6 +218,8 @@ async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl:
         "total_duration_ms": 0,
         "results": []
     }
+    if cache:
+        all_results["cache"] = cache.stats
     
     for i, query_config in enumerate(queries):
         query = query_config.get("query")
@@ -111,6 +233,7 @@ async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl:
         if working_dir:
             print(f"Working directory: {working_dir}")
         
+        cache_key = None
         try:
             # Set working directory if specified
             original_cwd = None
@@ -123,6 +246,26 @@ async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl:
             # Create client with options if working directory is specified
             options = ClaudeCodeOptions() if working_dir else None
             
+            if cache:
+                fingerprint = working_dir_fingerprint(os.getcwd())
+                if fingerprint:
+                    cache_key = cache.make_key(query, options, fingerprint)
+                    cached = cache.get(cache_key)
+                    if cached:
+                        # session_id, num_turns, cost and duration describe the original run
+                        result_data = dict(cached, query_index=i + 1, cache_hit=True,
+                                           working_dir=working_dir or os.getcwd(),
+                                           cached_from_session_id=cached.get("session_id"))
+                        all_results["results"].append(result_data)
+                        print(f"Cache hit for query {i+1} (saved ${cached.get('cost_usd') or 0.0:.4f})")
+                        if output_jsonl:
+                            with open(output_jsonl, 'a', encoding='utf-8') as f:
+                                f.write(json.dumps(result_data, ensure_ascii=False) + '\n')
+                            print(f"Saved result {i+1} to {output_jsonl}")
+                        continue
+                else:
+                    cache.stats["uncacheable"] += 1
+            
             async with ClaudeSDKClient(options=options) as client:
                 await client.query(query)
                 
@@ -145,6 +288,11 @@ async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl:
                             "status": "success"
                         }
                         
+                        if cache:
+                            result_data["cache_hit"] = False
+                            if cache_key:
+                                cache.put(cache_key, result_data)
+                        
                         # Update totals
                         all_results["total_cost_usd"] += message.total_cost_usd
                         all_results["total_duration_ms"] += message.duration_ms
@@ -202,6 +350,9 @@ async def process_multiple_queries(queries: List[Dict[str, str]], output_jsonl:
             # Restore original working directory
             if original_cwd:
                 os.chdir(original_cwd)
+            # Persist after every cached lookup so a crash mid-batch keeps earlier entries
+            if cache_key:
+                cache.save()
     
     return all_results
 
@@ -258,6 +409,11 @@ def print_query_summary(results: Dict, output_jsonl_file: Optional[str] = None,
     print(f"Queries processed: {results['queries_processed']}")
     print(f"Total cost: ${results['total_cost_usd']:.4f}")
     print(f"Total duration: {results['total_duration_ms']}ms")
+    cache_stats = results.get('cache')
+    if cache_stats:
+        print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['uncacheable']} uncacheable (not a git repo)")
+        print(f"Saved by cache: ${cache_stats['saved_cost_usd']:.4f} | {cache_stats['saved_duration_ms']}ms")
     if output_jsonl_file:
         print(f"Results saved to: {output_jsonl_file}")
     print(f"{'='*60}\n")
@@ -267,7 +423,7 @@ def print_query_summary(results: Dict, output_jsonl_file: Optional[str] = None,
         for result in results['results']:
             status_emoji = "✅" if result['status'] == 'success' else "❌" if result['status'] == 'error' else "⚠️"
             print(f"{status_emoji} Query {result['query_index']}: {result['query'][:80]}{'...' if len(result['query']) > 80 else ''}")
-            print(f"   Status: {result['status']}")
+            print(f"   Status: {result['status']}{' (cached)' if result.get('cache_hit') else ''}")
             print(f"   Working Dir: {result['working_dir']}")
             
             if result['status'] == 'success':
@@ -288,6 +444,14 @@ def parse_args():
                        help='Path to JSONL input file containing queries')
     parser.add_argument('--show-case', action='store_true', default=False,
                        help='Show detailed case information in console output')
+    parser.add_argument('--cache', action='store_true', default=False,
+                       help='Reuse results for identical queries against unchanged git working trees')
+    parser.add_argument('--cache-file', type=str, default='../data/query_cache.json',
+                       help='Path to the result cache file')
+    parser.add_argument('--cache-ttl-hours', type=float, default=168,
+                       help='Cached results older than this are ignored (default: 168)')
+    parser.add_argument('--cache-max-entries', type=int, default=1000,
+                       help='Maximum number of cached results (default: 1000)')
     return parser.parse_args()
 
 async def main():
@@ -319,8 +483,13 @@ async def main():
         ]
         print("Using default example queries (use --input to specify custom queries)")
     
+    cache = None
+    if args.cache:
+        cache = QueryResultCache(args.cache_file, ttl_seconds=args.cache_ttl_hours * 3600,
+                                 max_entries=args.cache_max_entries)
+    
     # Process queries
-    results = await process_multiple_queries(queries, output_jsonl=args.output)
+    results = await process_multiple_queries(queries, output_jsonl=args.output, cache=cache)
     
     # Print summary with show_case option
     print_query_summary(results, args.output, args.show_case)
@@ -390,10 +559,13 @@ USAGE_EXAMPLES = """
 3. 显示详细结果:
    python cc_sdk.py --show-case
 
-4. 测试连接:
+4. 对未改动仓库的重复查询复用结果缓存:
+   python cc_sdk.py --input queries.jsonl --cache --cache-ttl-hours 24
+
+5. 测试连接:
    python -c "import asyncio; from cc_sdk import test_connection; asyncio.run(test_connection())"
 
-5. 简单查询示例:
+6. 简单查询示例:
    python -c "import asyncio; from cc_sdk import simple_query_example; asyncio.run(simple_query_example('你好，请介绍一下这个项目', '/home/tuney.zh/OpenCoder'))"
 
 前提条件: